@@ -0,0 +1,38 @@
+"""
+Encode/decode throughput of each installed Datagram codec.
+
+    python benchmarks/bench_codec.py
+"""
+
+import timeit
+
+import jugg
+
+
+N_ROUNDS = 100000
+
+
+def main():
+    dg = jugg.core.Datagram(
+        command = jugg.constants.CMD_RESP,
+        sender = 'alice',
+        recipient = 'bob',
+        data = 'x' * 256)
+
+    for name in jugg.codec.CODECS:
+        jugg.core.Datagram.codec = jugg.codec.get_codec(name)
+        bytes_ = dg.to_bytes()
+
+        encode = timeit.timeit(dg.to_bytes, number = N_ROUNDS)
+        decode = timeit.timeit(
+            lambda: jugg.core.Datagram.from_bytes(bytes_),
+            number = N_ROUNDS)
+
+        print('%-8s encode %6.2f us  decode %6.2f us' % (
+            name,
+            encode / N_ROUNDS * 1e6,
+            decode / N_ROUNDS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
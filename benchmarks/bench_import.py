@@ -0,0 +1,45 @@
+"""
+Wall-clock time to import jugg entry points in a fresh interpreter.
+
+    python benchmarks/bench_import.py
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+
+N_RUNS = 20
+STATEMENTS = [
+    'pass',
+    'import jugg',
+    'import jugg.constants',
+    'from jugg.datagram import Datagram',
+    'from jugg.core import Datagram',
+    'import jugg.client, jugg.server',
+]
+
+
+def measure(statement):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.join(os.path.dirname(__file__), '..')
+
+    best = None
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', statement], env = env)
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    for statement in STATEMENTS:
+        print('%-36s %7.1f ms' % (statement, measure(statement) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
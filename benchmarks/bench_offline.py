@@ -0,0 +1,65 @@
+"""
+Write and drain throughput of the offline message queue.
+
+    python benchmarks/bench_offline.py
+"""
+
+import asyncio
+import shutil
+import tempfile
+import time
+
+import jugg
+
+
+N_MESSAGES = 50000
+N_RECIPIENTS = 10
+PAYLOAD = 'x' * 256
+
+
+async def drain(queue, names) -> int:
+    n_drained = 0
+
+    async def send(batch):
+        nonlocal n_drained
+        n_drained += len(batch)
+        return True
+
+    for name in names:
+        await queue.drain(name, send)
+
+    return n_drained
+
+
+def main():
+    root = tempfile.mkdtemp()
+    queue = jugg.storage.OfflineQueue(root)
+    names = ['user%i' % i for i in range(N_RECIPIENTS)]
+
+    dgs = [
+        jugg.core.Datagram(
+            command = jugg.constants.CMD_RESP,
+            sender = 'sender',
+            recipient = names[i % N_RECIPIENTS],
+            data = PAYLOAD)
+        for i in range(N_MESSAGES)]
+
+    start = time.perf_counter()
+    for dg in dgs:
+        queue.append(dg.recipient, dg)
+    queue.sync()
+    elapsed = time.perf_counter() - start
+    print('write  %9.0f msg/s' % (N_MESSAGES / elapsed))
+
+    start = time.perf_counter()
+    loop = asyncio.get_event_loop()
+    n_drained = loop.run_until_complete(drain(queue, names))
+    elapsed = time.perf_counter() - start
+    print('drain  %9.0f msg/s' % (n_drained / elapsed))
+
+    loop.run_until_complete(queue.shutdown())
+    shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-message round-trip latency of Node over each transport.
+
+    python benchmarks/bench_transports.py [certfile keyfile]
+
+The TLS transports are only measured when a certificate is supplied.
+"""
+
+import asyncio
+import os
+import ssl
+import sys
+import tempfile
+import time
+
+import jugg
+
+
+N_MESSAGES = 2000
+PAYLOAD = 'x' * 256
+
+
+async def handshake(node):
+    await node.send_handshake()
+    await node.handle_handshake(await node.recv())
+
+
+async def echo(stream_reader, stream_writer):
+    node = jugg.core.Node(stream_reader, stream_writer)
+    await handshake(node)
+
+    while True:
+        dg = await node.recv()
+        if not dg:
+            break
+
+        await node.send(dg)
+
+
+async def measure(name, server_coro, client_coro):
+    server = await server_coro
+    node = jugg.core.Node(*await client_coro)
+    await handshake(node)
+
+    start = time.perf_counter()
+    for _ in range(N_MESSAGES):
+        await node.send_response(PAYLOAD)
+        await node.recv()
+    elapsed = time.perf_counter() - start
+
+    print('%-16s %8.1f us/msg' % (name, elapsed / N_MESSAGES * 1e6))
+
+    await node.stop()
+    server.close()
+    await server.wait_closed()
+
+
+async def main(certfile = None, keyfile = None):
+    path = os.path.join(tempfile.mkdtemp(), 'jugg.sock')
+
+    await measure(
+        'tcp',
+        asyncio.start_server(echo, '127.0.0.1', 14920),
+        asyncio.open_connection('127.0.0.1', 14920))
+
+    await measure(
+        'unix',
+        asyncio.start_unix_server(echo, path),
+        asyncio.open_unix_connection(path))
+
+    if certfile and keyfile:
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(certfile, keyfile)
+
+        client_ctx = ssl.create_default_context()
+        client_ctx.check_hostname = False
+        client_ctx.verify_mode = ssl.CERT_NONE
+
+        await measure(
+            'tcp+tls',
+            asyncio.start_server(
+                echo, '127.0.0.1', 14921,
+                ssl=server_ctx),
+            asyncio.open_connection(
+                '127.0.0.1', 14921,
+                ssl=client_ctx))
+
+        os.remove(path)
+        await measure(
+            'unix+tls',
+            asyncio.start_unix_server(echo, path, ssl=server_ctx),
+            asyncio.open_unix_connection(
+                path,
+                ssl=client_ctx, server_hostname='localhost'))
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main(*sys.argv[1:3]))
@@ -7,20 +7,23 @@ __email__ = 'thezachgates@gmail.com'
 
 __all__ = [
     'client',
+    'codec',
     'constants',
     'core',
+    'datagram',
+    'federation',
     'security',
     'server',
+    'storage',
     'utils',
 ]
 
-try:
-    import os, sys
-    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-    for module in __all__:
-        __import__('jugg.' + module)
-
-    del os, sys
-except NameError:
-    pass
+def __getattr__(name):
+    # Import submodules on first access
+    if name in __all__:
+        import importlib
+        return importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError(
+            'module %r has no attribute %r' % (__name__, name))
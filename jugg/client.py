@@ -2,7 +2,7 @@ import asyncio
 import base64
 import pyarchy
 import socket
-import srp
+import ssl
 
 from . import constants, utils
 from .constants import ERROR_INFO_MAP
@@ -14,37 +14,145 @@ class Client(ClientBase):
     def __init__(self,
                  host: str = None, port: int = None,
                  socket_: socket.socket = None,
-                 hmac_key: bytes = None, challenge_key: bytes = None):
-        if host and port:
+                 hmac_key: bytes = None, challenge_key: bytes = None,
+                 streams: tuple = None,
+                 path: str = None, ssl_: ssl.SSLContext = None,
+                 server_hostname: str = None):
+        self._ssl = ssl_
+        self._server_hostname = server_hostname
+
+        if streams:
+            self._address = streams[1].get_extra_info('peername')
+            self._socket = streams[1].get_extra_info('socket')
+        elif path:
+            self._address = path
+            self._socket = None
+        elif host and port:
             self._address = (host, port)
             self._socket = None
         elif socket_:
             self._address = socket_.getsockname()
             self._socket = socket_
         else:
-            raise TypeError('must supply either address or socket')
+            raise TypeError('must supply either address, socket, or streams')
+
+        # Where to reconnect to; see Client.reconnect
+        if isinstance(self._address, tuple):
+            self._addresses = [self._address]
+        else:
+            self._addresses = []
+
+        self.reconnecting = None
+
+        if not streams:
+            loop = asyncio.get_event_loop()
+            streams = loop.run_until_complete(self.make_streams(loop))
 
-        loop = asyncio.get_event_loop()
-        streams = loop.run_until_complete(self.make_streams(loop))
         ClientBase.__init__(self, *streams, hmac_key, challenge_key)
 
+    @classmethod
+    async def connect(cls,
+                      host: str = None, port: int = None,
+                      addresses: list = None,
+                      hmac_key: bytes = None, challenge_key: bytes = None,
+                      timeout: float = constants.CONNECT_TIMEOUT,
+                      delay: float = constants.CONNECT_DELAY,
+                      path: str = None, ssl_: ssl.SSLContext = None,
+                      server_hostname: str = None,
+                      **kwargs):
+        addresses = list(addresses or [])
+        if host and port:
+            addresses.insert(0, (host, port))
+        elif not (addresses or path):
+            raise TypeError('must supply at least one address or path')
+
+        if path:
+            streams = await asyncio.wait_for(
+                asyncio.open_unix_connection(
+                    path,
+                    **cls._ssl_options(ssl_, server_hostname)),
+                timeout)
+        else:
+            # Race every address; the first to connect wins
+            streams = await utils.open_connection(
+                addresses, timeout, delay,
+                **cls._ssl_options(
+                    ssl_,
+                    server_hostname or addresses[0][0]))
+
+        client = cls(
+            hmac_key = hmac_key, challenge_key = challenge_key,
+            streams = streams,
+            ssl_ = ssl_, server_hostname = server_hostname,
+            **kwargs)
+
+        if path:
+            client._address = path
+        else:
+            client._addresses = addresses
+
+        return client
+
+    async def reconnect(self, delay: float = 0, **kwargs):
+        await asyncio.sleep(delay)
+
+        if isinstance(self._address, str):
+            target = {'path': self._address}
+        else:
+            target = {'addresses': self._addresses}
+
+        client = await self.connect(
+            hmac_key = self._hmac_key, challenge_key = self._challenge_key,
+            ssl_ = self._ssl, server_hostname = self._server_hostname,
+            **target,
+            **kwargs)
+
+        await self.handle_reconnect(client)
+        return client
+
+    @staticmethod
+    def _ssl_options(ssl_, host):
+        if ssl_:
+            return {'ssl': ssl_, 'server_hostname': host}
+        else:
+            return {}
+
     async def make_streams(self, loop):
         if self._socket:
-            pass
+            return await asyncio.open_connection(sock=self._socket)
+        elif isinstance(self._address, str):
+            return await asyncio.open_unix_connection(
+                self._address,
+                **self._ssl_options(self._ssl, self._server_hostname))
         elif self._address:
-            # Make the socket
-            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self._socket.connect(self._address)
+            return await utils.open_connection(
+                [self._address],
+                **self._ssl_options(
+                    self._ssl,
+                    self._server_hostname or self._address[0]))
         else:
             raise AttributeError('no socket or address specified')
 
-        return await asyncio.open_connection(loop=loop, sock=self._socket)
-
     async def handle_handshake(self, dg):
         await super().handle_handshake(dg)
         self.id = pyarchy.core.Identity(dg.recipient)
 
+    async def handle_migrate(self, dg):
+        # The server is draining; leave now and come back after the
+        # jittered delay. Await `reconnecting` for the new Client.
+        self.migrate_delay = float(dg.data)
+        await self.stop()
+
+        self.reconnecting = asyncio.ensure_future(
+            self.reconnect(self.migrate_delay))
+
+    # Add functionality in subclass (e.g. start and authenticate)
+    async def handle_reconnect(self, client):
+        return NotImplemented
+
     async def handle_authenticate(self, dg):
+        import srp
+
         # Credentials
         if not dg.recipient:
             await self.do_error(constants.ERR_CREDENTIALS)
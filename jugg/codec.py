@@ -0,0 +1,87 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(object):
+
+    name = 'json'
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def loads(self, bytes_: bytes):
+        return json.loads(bytes_)
+
+
+class UJSONCodec(JSONCodec):
+
+    name = 'ujson'
+
+    def dumps(self, obj) -> bytes:
+        try:
+            return ujson.dumps(obj).encode()
+        except OverflowError:
+            # Integers too large for ujson (e.g. the handshake key)
+            return JSONCodec.dumps(self, obj)
+
+    def loads(self, bytes_: bytes):
+        try:
+            return ujson.loads(bytes_)
+        except ValueError:
+            # Integers too large for ujson (e.g. the handshake key)
+            return JSONCodec.loads(self, bytes_)
+
+
+class ORJSONCodec(JSONCodec):
+
+    name = 'orjson'
+
+    def dumps(self, obj) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # Integers too large for orjson (e.g. the handshake key)
+            return JSONCodec.dumps(self, obj)
+
+    def loads(self, bytes_: bytes):
+        try:
+            return orjson.loads(bytes_)
+        except orjson.JSONDecodeError:
+            # Integers too large for orjson (e.g. the handshake key)
+            return JSONCodec.loads(self, bytes_)
+
+
+# Available codecs, fastest first
+CODECS = {}
+if orjson:
+    CODECS[ORJSONCodec.name] = ORJSONCodec
+if ujson:
+    CODECS[UJSONCodec.name] = UJSONCodec
+CODECS[JSONCodec.name] = JSONCodec
+
+
+def get_codec(name: str = None) -> JSONCodec:
+    if name is None:
+        return next(iter(CODECS.values()))()
+    elif name in CODECS:
+        return CODECS[name]()
+    else:
+        raise ValueError('codec %r is not available' % name)
+
+
+__all__ = [
+    JSONCodec,
+    UJSONCodec,
+    ORJSONCodec,
+    CODECS,
+    get_codec,
+]
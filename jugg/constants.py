@@ -1,17 +1,52 @@
 # System
 NAME_REGEX = r'\w{1,32}'
 
+# Network
+CONNECT_TIMEOUT = 10.0
+CONNECT_DELAY = 0.25
+DRAIN_BATCH_SIZE = 64
+DRAIN_INTERVAL = 0.1
+MIGRATE_BACKOFF = 5.0
+MIGRATE_TIMEOUT = 10.0
+PEER_RETRY = 5.0
+
+# Security
+REPLAY_WINDOW = 64
+CLOCK_SKEW = 30.0
+REKEY_BYTES = 64 * 1024 * 1024
+REKEY_INTERVAL = 60 * 60
+
+# Storage
+OFFLINE_SEGMENT_SIZE = 4 * 1024 * 1024
+OFFLINE_FSYNC_BATCH = 64
+OFFLINE_FSYNC_INTERVAL = 1.0
+OFFLINE_MAX_AGE = 7 * 24 * 60 * 60
+OFFLINE_MAX_BYTES = 64 * 1024 * 1024
+OFFLINE_MAX_TOTAL_BYTES = 1024 * 1024 * 1024
+OFFLINE_MAX_WRITERS = 256
+OFFLINE_IDLE_TIMEOUT = 60.0
+OFFLINE_EXPIRE_INTERVAL = 60.0
+OFFLINE_BATCH_SIZE = 256
+
 # Commands
 CMD_SHAKE = -1
 CMD_ERR = 0
 CMD_RESP = 1
 CMD_AUTH = 2
+CMD_MIGRATE = 3
+CMD_REKEY = 4
+CMD_PRESENCE = 5
+CMD_FORWARD = 6
 
 CMD_2_NAME = {
     CMD_SHAKE: 'handshake',
     CMD_ERR: 'error',
     CMD_RESP: 'response',
     CMD_AUTH: 'authenticate',
+    CMD_MIGRATE: 'migrate',
+    CMD_REKEY: 'rekey',
+    CMD_PRESENCE: 'presence',
+    CMD_FORWARD: 'forward',
 }
 
 # Error codes
@@ -21,6 +56,7 @@ ERR_CREDENTIALS = 1
 ERR_HMAC = 2
 ERR_CHALLENGE = 3
 ERR_VERIFICATION = 4
+ERR_PEER = 5
 
 ERROR_INFO_MAP = {
     ERR_NO_CONNECTION: 'could not connect',
@@ -29,16 +65,29 @@ ERROR_INFO_MAP = {
     ERR_HMAC: 'invalid hmac',
     ERR_CHALLENGE: 'failed challenge',
     ERR_VERIFICATION: 'failed verification',
+    ERR_PEER: 'invalid peer',
 }
 
 
 __all__ = [
     # System
     'NAME_REGEX',
+    # Network
+    'CONNECT_TIMEOUT', 'CONNECT_DELAY',
+    'DRAIN_BATCH_SIZE', 'DRAIN_INTERVAL', 'MIGRATE_BACKOFF',
+    'MIGRATE_TIMEOUT', 'PEER_RETRY',
+    # Security
+    'REPLAY_WINDOW', 'CLOCK_SKEW', 'REKEY_BYTES', 'REKEY_INTERVAL',
+    # Storage
+    'OFFLINE_SEGMENT_SIZE', 'OFFLINE_FSYNC_BATCH', 'OFFLINE_FSYNC_INTERVAL',
+    'OFFLINE_MAX_AGE', 'OFFLINE_MAX_BYTES', 'OFFLINE_MAX_TOTAL_BYTES',
+    'OFFLINE_MAX_WRITERS', 'OFFLINE_IDLE_TIMEOUT', 'OFFLINE_EXPIRE_INTERVAL',
+    'OFFLINE_BATCH_SIZE',
     # Commands
-    'CMD_SHAKE', 'CMD_ERR', 'CMD_RESP', 'CMD_AUTH',
+    'CMD_SHAKE', 'CMD_ERR', 'CMD_RESP', 'CMD_AUTH', 'CMD_MIGRATE',
+    'CMD_REKEY', 'CMD_PRESENCE', 'CMD_FORWARD',
     'CMD_2_NAME',
     # Error codes
     'ERR_NO_CONNECTION', 'ERR_DISCONNECT', 'ERR_CREDENTIALS', 'ERR_HMAC',
-    'ERR_CHALLENGE', 'ERR_VERIFICATION', 'ERROR_INFO_MAP',
+    'ERR_CHALLENGE', 'ERR_VERIFICATION', 'ERR_PEER', 'ERROR_INFO_MAP',
 ]
@@ -1,140 +1,139 @@
 import asyncio
 import base64
-import json
 import pyarchy
 import socket
 import struct
 import time
 
 from . import constants, security
+from .datagram import Datagram
 
 
-class Datagram(object):
+class Node(security.KeyHandler, pyarchy.common.ClassicObject):
 
-    @classmethod
-    def from_string(cls, str_: str):
-        dg = cls(**json.loads(str_))
+    # Sequence number and send time, checked before the payload is decoded
+    header = struct.Struct('!Qd')
 
-        # Verify timestamp
-        if dg.timestamp >= time.time():
-            return cls()
-        else:
-            return dg
+    def __init__(self, stream_reader, stream_writer):
+        security.KeyHandler.__init__(
+            self,
+            stream_writer.get_extra_info('ssl_object') is not None)
+        pyarchy.common.ClassicObject.__init__(self, '', False)
 
-    def __init__(self,
-                 command: int = None,
-                 sender: str = None, recipient: str = None,
-                 data: str = None, hmac: str = None,
-                 timestamp: float = None):
-        object.__init__(self)
-
-        self.__command = int(command) if command else command
-        self.__sender = str(sender) if sender else sender
-        self.__recipient = str(recipient) if recipient else recipient
-        self.__data = data
-        self.__hmac = str(hmac) if hmac else hmac
-        self.__ts = float(timestamp) if timestamp is not None else time.time()
-
-    def __str__(self):
-        return json.dumps({
-            'command': self.command,
-            'sender': self.sender,
-            'recipient': self.recipient,
-            'data': self.data,
-            'hmac': self.hmac,
-            'timestamp': self.timestamp,
-        })
+        self._stream_reader = stream_reader
+        self._stream_writer = stream_writer
 
-    @property
-    def command(self) -> int:
-        return self.__command
+        self._commands = {}
 
-    @command.setter
-    def command(self, command):
-        self.__command = int(command)
+        self._sequence = 0
+        self._replay_window = security.ReplayWindow()
 
-    @property
-    def sender(self) -> str:
-        return self.__sender
+        # Traffic sent under the current keys, counted once keyed
+        self._rekey_bytes = 0
+        self._rekey_time = None
 
-    @property
-    def recipient(self) -> str:
-        return self.__recipient
+    def rekey_due(self) -> bool:
+        if not self.keyed or self.offload:
+            return False
 
-    @recipient.setter
-    def recipient(self, recipient: str):
-        self.__recipient = str(recipient)
+        # The first keys last from keying, not from the connection
+        if self._rekey_time is None:
+            self._rekey_bytes = 0
+            self._rekey_time = time.time()
 
-    @property
-    def route(self) -> tuple:
-        return (self.sender, self.recipient)
+        return self._rekey_bytes >= constants.REKEY_BYTES or \
+            time.time() - self._rekey_time >= constants.REKEY_INTERVAL
 
-    @property
-    def data(self):
-        return self.__data
+    def pack(self, dg: Datagram) -> bytes:
+        data = b''
 
-    @data.setter
-    def data(self, data):
-        if isinstance(data, bytes):
-            self.__data = data.decode()
-        else:
-            self.__data = data
+        # Announce the rekey under the old keys, then switch in place, so
+        # nothing in flight has to wait
+        if self.rekey_due():
+            data += self.pack_frame(
+                Datagram(
+                    command = constants.CMD_REKEY,
+                    sender = self.id,
+                    recipient = self.id))
+            self.rekey_send()
 
-    @property
-    def hmac(self) -> str:
-        return self.__hmac
+            self._rekey_bytes = 0
+            self._rekey_time = time.time()
 
-    @property
-    def timestamp(self) -> float:
-        return self.__ts
+        data += self.pack_frame(dg)
+        self._rekey_bytes += len(data)
+        return data
 
+    def pack_frame(self, dg: Datagram) -> bytes:
+        self._sequence += 1
+        header = self.header.pack(self._sequence, time.time())
 
-class Node(security.KeyHandler, pyarchy.common.ClassicObject):
+        data = dg.to_bytes()
+        data = header + base64.b85encode(data)
+        data = self.encrypt(data)
 
-    def __init__(self, stream_reader, stream_writer):
-        security.KeyHandler.__init__(self)
-        pyarchy.common.ClassicObject.__init__(self, '', False)
+        n_bytes = len(data)
+        pointer = struct.pack('I', socket.htonl(n_bytes))
 
-        self._stream_reader = stream_reader
-        self._stream_writer = stream_writer
+        return pointer + data
 
-        self._commands = {}
+    async def send(self, dg: Datagram) -> bool:
+        return await self.send_many([dg])
 
-    async def send(self, dg: Datagram):
-        data = str(dg).encode()
-        data = base64.b85encode(data)
-        data = self.encrypt(data)
+    async def send_many(self, dgs: list) -> bool:
+        # Writes to a closed transport are dropped silently
+        if self._stream_writer.is_closing():
+            return False
 
-        n_bytes = len(data)
-        pointer = struct.pack('I', socket.htonl(n_bytes))
+        # One write and one drain for the whole batch
+        data = b''.join(map(self.pack, dgs))
 
         try:
-            self._stream_writer.write(pointer + data)
+            self._stream_writer.write(data)
             await self._stream_writer.drain()
         except ConnectionResetError:
             # Client crashed
-            pass
+            return False
+
+        return not self._stream_writer.is_closing()
 
     async def recv(self, n_bytes: int = None):
         try:
-            if n_bytes is None:
-                pointer = await self._stream_reader.readexactly(4)
-                n_bytes = socket.ntohl(struct.unpack('I', pointer)[0])
-
-            data = await self._stream_reader.read(n_bytes)
-            data = self.decrypt(data)
-            data = base64.b85decode(data).decode()
-            return Datagram.from_string(data)
+            while True:
+                if n_bytes is None:
+                    pointer = await self._stream_reader.readexactly(4)
+                    n_bytes = socket.ntohl(struct.unpack('I', pointer)[0])
+
+                data = await self._stream_reader.read(n_bytes)
+                data = self.decrypt(data)
+
+                # Drop replayed or stale frames before decoding them
+                if not self._replay_window.verify(
+                        *self.header.unpack_from(data)):
+                    n_bytes = None
+                    continue
+
+                data = base64.b85decode(data[self.header.size:])
+                dg = Datagram.from_bytes(data)
+
+                # Frames after a rekey use the next keys; there is
+                # nothing to ratchet before the session is keyed
+                if dg.command == constants.CMD_REKEY:
+                    if self.keyed:
+                        self.rekey_recv()
+                    n_bytes = None
+                else:
+                    return dg
         except ConnectionResetError:
             # Client crashed
             pass
-        except asyncio.streams.IncompleteReadError:
+        except asyncio.IncompleteReadError:
             # Failed to receive pointer
             pass
         except struct.error:
             # Received invalid pointer
             pass
-        except json.decoder.JSONDecodeError:
+        except ValueError:
             # Bad Datagram
             pass
 
@@ -192,6 +191,18 @@ class Node(security.KeyHandler, pyarchy.common.ClassicObject):
     async def handle_error(self, dg: Datagram):
         return NotImplemented
 
+    async def send_migrate(self, delay: float):
+        await self.send(
+            Datagram(
+                command = constants.CMD_MIGRATE,
+                sender = self.id,
+                recipient = self.id,
+                data = delay))
+
+    # Add functionality in subclass
+    async def handle_migrate(self, dg: Datagram):
+        return NotImplemented
+
     async def send_response(self, data):
         await self.send(
             Datagram(
@@ -0,0 +1,119 @@
+import time
+
+from . import constants
+
+
+class _DefaultCodec(object):
+
+    # Resolved on first use, so importing Datagram loads no JSON library
+    def __get__(self, obj, cls):
+        from .codec import get_codec
+        cls.codec = get_codec()
+        return cls.codec
+
+
+class Datagram(object):
+
+    # Fastest JSON codec installed; see jugg.codec
+    codec = _DefaultCodec()
+
+    @classmethod
+    def from_bytes(cls, bytes_: bytes):
+        obj = cls.codec.loads(bytes_)
+
+        # Scalars, wrong-length arrays and unknown keys are malformed too
+        try:
+            if isinstance(obj, dict):
+                dg = cls(**obj)
+            elif isinstance(obj, list) and len(obj) == 6:
+                dg = cls(*obj)
+            else:
+                raise TypeError('expected an object or 6-element array')
+        except TypeError as e:
+            raise ValueError('malformed datagram: %s' % e) from e
+
+        # Verify timestamp
+        if dg.timestamp > time.time() + constants.CLOCK_SKEW:
+            return cls()
+        else:
+            return dg
+
+    @classmethod
+    def from_string(cls, str_: str):
+        return cls.from_bytes(str_.encode())
+
+    def __init__(self,
+                 command: int = None,
+                 sender: str = None, recipient: str = None,
+                 data: str = None, hmac: str = None,
+                 timestamp: float = None):
+        object.__init__(self)
+
+        self.__command = int(command) if command else command
+        self.__sender = str(sender) if sender else sender
+        self.__recipient = str(recipient) if recipient else recipient
+        self.__data = data
+        self.__hmac = str(hmac) if hmac else hmac
+        self.__ts = float(timestamp) if timestamp is not None else time.time()
+
+    def __str__(self):
+        return self.to_bytes().decode()
+
+    def to_bytes(self) -> bytes:
+        # Positional, in constructor order
+        return self.codec.dumps([
+            self.__command,
+            self.__sender,
+            self.__recipient,
+            self.__data,
+            self.__hmac,
+            self.__ts,
+        ])
+
+    @property
+    def command(self) -> int:
+        return self.__command
+
+    @command.setter
+    def command(self, command):
+        self.__command = int(command)
+
+    @property
+    def sender(self) -> str:
+        return self.__sender
+
+    @property
+    def recipient(self) -> str:
+        return self.__recipient
+
+    @recipient.setter
+    def recipient(self, recipient: str):
+        self.__recipient = str(recipient)
+
+    @property
+    def route(self) -> tuple:
+        return (self.sender, self.recipient)
+
+    @property
+    def data(self):
+        return self.__data
+
+    @data.setter
+    def data(self, data):
+        if isinstance(data, bytes):
+            self.__data = data.decode()
+        else:
+            self.__data = data
+
+    @property
+    def hmac(self) -> str:
+        return self.__hmac
+
+    @property
+    def timestamp(self) -> float:
+        return self.__ts
+
+
+__all__ = [
+    Datagram,
+]
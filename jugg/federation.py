@@ -0,0 +1,309 @@
+import asyncio
+import base64
+
+from . import constants
+from .client import Client
+from .core import Datagram, Node
+
+
+class Directory(object):
+
+    def __init__(self):
+        object.__init__(self)
+
+        # Client name to the node it is connected to, and the reverse
+        self._nodes = {}
+        self._names = {}
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, name: str):
+        return name in self._nodes
+
+    def lookup(self, name: str) -> str:
+        return self._nodes.get(name)
+
+    def names(self, node: str) -> set:
+        return set(self._names.get(node, ()))
+
+    def update(self,
+               node: str,
+               joined: list = (), left: list = (),
+               reset: bool = False):
+        if reset:
+            self.drop(node)
+
+        names = self._names.setdefault(node, set())
+
+        for name in left:
+            # Ignore stale leaves for clients that moved elsewhere
+            if self._nodes.get(name) == node:
+                del self._nodes[name]
+            names.discard(name)
+
+        for name in joined:
+            self._nodes[name] = node
+            names.add(name)
+
+    def drop(self, node: str):
+        for name in self._names.pop(node, ()):
+            if self._nodes.get(name) == node:
+                del self._nodes[name]
+
+
+class PeerLink(Client):
+
+    def __init__(self, *args, federation = None, **kwargs):
+        self.federation = federation
+        self.peer = None
+        self.peer_address = None
+
+        Client.__init__(self, *args, **kwargs)
+
+    async def handle_handshake(self, dg: Datagram):
+        await super().handle_handshake(dg)
+
+        # Authenticate as this node, with proof that it is one
+        await self.send(
+            Datagram(
+                command = constants.CMD_AUTH,
+                sender = self.id,
+                data = self.federation.node,
+                hmac = self.federation.sign(self)))
+
+    async def handle_migrate(self, dg: Datagram):
+        # Federation.dial reconnects on its own schedule
+        await self.stop()
+
+    async def handle_presence(self, dg: Datagram):
+        await self.federation.handle_presence(self, dg)
+
+    async def handle_forward(self, dg: Datagram):
+        await self.federation.handle_forward(self, dg)
+
+
+class Federation(object):
+
+    def __init__(self,
+                 server,
+                 node: str,
+                 peers: list = None,
+                 hmac_key: bytes = None, challenge_key: bytes = None,
+                 federation_key: bytes = None):
+        object.__init__(self)
+
+        self.server = server
+        self.node = str(node)
+
+        self._peers = list(peers or [])
+        self._hmac_key = hmac_key or b''
+        self._challenge_key = challenge_key or b''
+        self._federation_key = federation_key
+
+        # Where remote clients are, and one pooled link per remote node
+        self.directory = Directory()
+        self.links = {}
+
+        self._addresses = {}
+        self._tasks = []
+
+    def start(self):
+        loop = asyncio.get_event_loop()
+        self._tasks = [
+            loop.create_task(self.dial(tuple(address)))
+            for address in self._peers]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        for link in list(self.links.values()):
+            await Node.stop(link)
+
+        self.links.clear()
+
+    async def dial(self, address: tuple):
+        while True:
+            # Skip nodes that are already linked, whichever side dialed
+            if self._addresses.get(address) not in self.links:
+                try:
+                    link = await PeerLink.connect(
+                        *address,
+                        hmac_key = self._hmac_key,
+                        challenge_key = self._challenge_key,
+                        federation = self)
+                except (OSError, asyncio.TimeoutError):
+                    link = None
+
+                if link:
+                    link.peer_address = address
+                    try:
+                        await link.start()
+                    finally:
+                        self.unlink(link)
+
+            await asyncio.sleep(constants.PEER_RETRY)
+
+    async def link(self, node: str, conn: Node) -> bool:
+        if isinstance(conn, PeerLink):
+            self._addresses[conn.peer_address] = node
+
+        existing = self.links.get(node)
+        if existing and existing is not conn:
+            # Both sides keep the link dialed by the lower node name
+            dialer = self.node if isinstance(conn, PeerLink) else node
+            if dialer != min(self.node, node):
+                await Node.stop(conn)
+                return False
+            else:
+                self.unlink(existing)
+                await Node.stop(existing)
+
+        conn.peer = node
+        self.links[node] = conn
+        return True
+
+    def unlink(self, conn: Node):
+        node = getattr(conn, 'peer', None)
+        if node and self.links.get(node) is conn:
+            del self.links[node]
+            self.directory.drop(node)
+
+    def _transcript(self,
+                    node: str,
+                    sender_key: int, recipient_key: int) -> bytes:
+        # Bind the proof to this session's DH keys, sender's first, so it
+        # can neither be replayed on another link nor reflected back
+        return ('%s:%d:%d' % (node, sender_key, recipient_key)).encode()
+
+    def sign(self, conn: Node) -> str:
+        return base64.b85encode(
+            conn.generate_HMAC(
+                self._transcript(self.node, conn.key, conn.counter_key),
+                self._federation_key)).decode()
+
+    def verify(self, conn: Node, node: str, supplied_hmac: str) -> bool:
+        if not (isinstance(node, str) and supplied_hmac) or \
+           conn.counter_key is None:
+            return False
+
+        try:
+            return conn.verify_HMAC(
+                str(supplied_hmac).encode(),
+                self._transcript(node, conn.counter_key, conn.key),
+                self._federation_key)
+        except ValueError:
+            # Malformed HMAC
+            return False
+
+    def presence(self,
+                 joined: list = (), left: list = (),
+                 reset: bool = False) -> Datagram:
+        return Datagram(
+            command = constants.CMD_PRESENCE,
+            sender = self.node,
+            data = {
+                'node': self.node,
+                'joined': list(joined),
+                'left': list(left),
+                'reset': reset,
+            })
+
+    async def send_hello(self, conn: Node):
+        # A full snapshot, with proof that this is a federated node
+        dg = self.presence(self.server.names, reset = True)
+        dg.data['hmac'] = self.sign(conn)
+
+        await conn.send(dg)
+
+    async def announce(self, joined: list = (), left: list = ()):
+        dg = self.presence(joined, left)
+        await asyncio.gather(
+            *(link.send(dg) for link in list(self.links.values())),
+            return_exceptions = True)
+
+    async def accept(self, conn: Node, dg: Datagram):
+        # An inbound link that authenticated as a node; see PeerLink
+        if not self.verify(conn, dg.data, dg.hmac):
+            await conn.send_error(constants.ERR_PEER)
+            await Node.stop(conn)
+        elif await self.link(dg.data, conn):
+            await self.send_hello(conn)
+
+    def wrap(self, dg: Datagram, node: str) -> Datagram:
+        return Datagram(
+            command = constants.CMD_FORWARD,
+            sender = self.node,
+            recipient = node,
+            data = str(dg))
+
+    async def forward(self, dg: Datagram) -> bool:
+        node = self.directory.lookup(dg.recipient)
+        link = self.links.get(node)
+
+        if link:
+            return await link.send(self.wrap(dg, node))
+        else:
+            return False
+
+    async def handoff(self, names: list):
+        # Pass on what was stored here while the clients' node was
+        # unreachable, now that presence shows where they are
+        offline = self.server.offline
+        for name in await offline.run(offline.stored, names):
+            node = self.directory.lookup(name)
+
+            async def send(batch: list) -> bool:
+                link = self.links.get(node)
+                return bool(link) and await link.send_many(
+                    [self.wrap(dg, node) for dg in batch])
+
+            if node and name not in self.server.names:
+                await offline.drain(name, send)
+
+    async def handle_presence(self, conn: Node, dg: Datagram):
+        data = dg.data if isinstance(dg.data, dict) else {}
+
+        if getattr(conn, 'peer', None) is None:
+            # The accepting node's answer to a PeerLink
+            if not isinstance(conn, PeerLink) or conn._name is None or \
+               not self.verify(conn, data.get('node'), data.get('hmac')):
+                await conn.send_error(constants.ERR_PEER)
+                await Node.stop(conn)
+                return
+            elif not await self.link(data['node'], conn):
+                return
+            else:
+                await self.send_hello(conn)
+        elif data.get('node') != conn.peer:
+            return
+
+        self.directory.update(
+            conn.peer,
+            data.get('joined', ()), data.get('left', ()),
+            bool(data.get('reset')))
+
+        if self.server.offline and data.get('joined'):
+            asyncio.ensure_future(self.handoff(list(data['joined'])))
+
+    async def handle_forward(self, conn: Node, dg: Datagram):
+        if getattr(conn, 'peer', None) is None:
+            await conn.send_error(constants.ERR_PEER)
+            return
+
+        try:
+            inner = Datagram.from_string(dg.data)
+        except (TypeError, ValueError):
+            # Bad Datagram
+            return
+
+        # Deliver here or hold it; never forward again
+        await self.server.route(inner, forwarded = True)
+
+
+__all__ = [
+    Directory,
+    PeerLink,
+    Federation,
+]
@@ -1,16 +1,15 @@
 import base64
+import functools
 import hashlib
 import hmac
 import random
+import time
 
-from Crypto.Cipher import AES
-from Crypto.Hash import SHA256
-from Crypto.Util.number import long_to_bytes
+from . import constants
 
-from . import core
 
-
-_DEF_P = int(
+# Parsed on first handshake; see _default_prime
+_DEF_P_DIGITS = (
     '6741187748806620932576983646169579908388179173131896217634330086718213'
     '7196897524293100294385477509911251666985176430415411153583804934148112'
     '2270719203394689775275781619712787479926285627950841056894489914560578'
@@ -31,13 +30,22 @@ _DEF_P = int(
     '6034739679137202157599997031290815163983987')
 
 
+@functools.lru_cache(maxsize=None)
+def _default_prime() -> int:
+    return int(_DEF_P_DIGITS)
+
+
 class KeyHandler(object):
 
-    def __init__(self):
+    def __init__(self, offload: bool = False):
         object.__init__(self)
 
-        self.__private_key = random.randint(1, _DEF_P - 1)
-        self.__public_key = pow(2, self.__private_key, _DEF_P)
+        # Leave confidentiality to the transport (e.g. TLS)
+        self.__offload = bool(offload)
+
+        # Generated on first use
+        self.__private_key = None
+        self.__public_key = None
 
         self.__counter_key = None
         self.__counter_cipher = None
@@ -45,10 +53,27 @@ class KeyHandler(object):
         self.__hash = None
         self.__counter_hash = None
 
+        # Traffic keys per direction once rekeyed, and how often they were
+        self.__send_hashes = None
+        self.__recv_hashes = None
+        self.__send_epoch = 0
+        self.__recv_epoch = 0
+
+    def __generate_keys(self):
+        if self.__private_key is None:
+            p = _default_prime()
+            self.__private_key = random.randint(1, p - 1)
+            self.__public_key = pow(2, self.__private_key, p)
+
     @property
     def key(self) -> int:
+        self.__generate_keys()
         return self.__public_key
 
+    @property
+    def offload(self) -> bool:
+        return self.__offload
+
     @property
     def counter_key(self) -> int:
         return self.__counter_key
@@ -56,11 +81,14 @@ class KeyHandler(object):
     @counter_key.setter
     def counter_key(self, key: int):
         if self.__counter_key is None:
+            from Crypto.Util.number import long_to_bytes
+
+            self.__generate_keys()
             self.__counter_key = int(key)
             self.__hash = self.generate_SHA256(long_to_bytes(pow(
                 self.__counter_key,
                 self.__private_key,
-                _DEF_P)))
+                _default_prime())))
         else:
             raise AttributeError('counter_key can only be set once')
 
@@ -87,10 +115,41 @@ class KeyHandler(object):
         else:
             raise AttributeError('counter_cipher can only be set once')
 
+    @property
+    def keyed(self) -> bool:
+        return bool(self.__hash and self.__counter_hash)
+
+    @property
+    def send_epoch(self) -> int:
+        return self.__send_epoch
+
+    @property
+    def recv_epoch(self) -> int:
+        return self.__recv_epoch
+
+    def __ratchet(self, hashes: tuple) -> tuple:
+        if not self.keyed:
+            raise AttributeError('cannot rekey before the session is keyed')
+
+        # Derive the next keys from the current ones; a hash, no exchange
+        return tuple(
+            self.generate_SHA256(hash_ + b'jugg-rekey')
+            for hash_ in hashes or (self.__hash, self.__counter_hash))
+
+    def rekey_send(self):
+        self.__send_hashes = self.__ratchet(self.__send_hashes)
+        self.__send_epoch += 1
+
+    def rekey_recv(self):
+        self.__recv_hashes = self.__ratchet(self.__recv_hashes)
+        self.__recv_epoch += 1
+
     def generate_AES256(self, key, iv):
+        from Crypto.Cipher import AES
         return AES.new(key, AES.MODE_CBC, iv)
 
     def generate_SHA256(self, bytes_: bytes):
+        from Crypto.Hash import SHA256
         return SHA256.new(bytes_).digest()
 
     def generate_HMAC(self, msg: bytes, key: int = None):
@@ -108,33 +167,115 @@ class KeyHandler(object):
         return hmac.compare_digest(gen_hmac, base64.b85decode(supplied_hmac))
 
     def encrypt(self, data: bytes) -> bytes:
-        # Pad the data
-        size = AES.block_size - len(data) % 16
+        if self.__offload:
+            return data
+
+        hash_, counter_hash = \
+            self.__send_hashes or (self.__hash, self.__counter_hash)
+
+        # Pad the data to the AES block size
+        size = 16 - len(data) % 16
         data += bytes([size]) * size
 
         # Encrypt with personal cipher
-        if self.cipher:
-            data = self.cipher.encrypt(data)
+        if hash_:
+            data = self.generate_AES256(
+                hash_[0:32], hash_[16:32]).encrypt(data)
 
         # Encrypt with alternate cipher
-        if self.counter_cipher:
-            data = self.counter_cipher.encrypt(data)
+        if counter_hash:
+            data = self.generate_AES256(
+                counter_hash[0:32], counter_hash[16:32]).encrypt(data)
 
         return data
 
     def decrypt(self, data: bytes) -> bytes:
+        if self.__offload:
+            return data
+
+        hash_, counter_hash = \
+            self.__recv_hashes or (self.__hash, self.__counter_hash)
+
         # Decrypt with alternate cipher
-        if self.counter_cipher:
-            data = self.counter_cipher.decrypt(data)
+        if counter_hash:
+            data = self.generate_AES256(
+                counter_hash[0:32], counter_hash[16:32]).decrypt(data)
 
         # Decrypt with personal cipher
-        if self.cipher:
-            data = self.cipher.decrypt(data)
+        if hash_:
+            data = self.generate_AES256(
+                hash_[0:32], hash_[16:32]).decrypt(data)
 
         # Unpad the data
         return data[:-data[-1]]
 
 
+class ReplayWindow(object):
+
+    def __init__(self, size: int = None, skew: float = None):
+        object.__init__(self)
+
+        # Read the defaults now, as Datagram.from_bytes does, so both checks
+        # follow changes to the constants
+        if size is None:
+            size = constants.REPLAY_WINDOW
+        if skew is None:
+            skew = constants.CLOCK_SKEW
+
+        self.__size = int(size)
+        self.__mask = (1 << self.__size) - 1
+        self.__skew = float(skew)
+
+        # Highest sequence number seen, and a bitmap of the ones before it
+        self.__highest = 0
+        self.__bitmap = 0
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def skew(self) -> float:
+        return self.__skew
+
+    @property
+    def highest(self) -> int:
+        return self.__highest
+
+    def verify(self, sequence: int, timestamp: float) -> bool:
+        # Stale or future-dated frame
+        if abs(time.time() - timestamp) > self.__skew:
+            return False
+
+        if sequence <= 0:
+            return False
+
+        # Ahead of the window; slide it forward
+        if sequence > self.__highest:
+            shift = sequence - self.__highest
+            if shift < self.__size:
+                self.__bitmap = ((self.__bitmap << shift) | 1) & self.__mask
+            else:
+                self.__bitmap = 1
+
+            self.__highest = sequence
+            return True
+
+        # Behind the window
+        offset = self.__highest - sequence
+        if offset >= self.__size:
+            return False
+
+        # Inside the window; reject if already seen
+        bit = 1 << offset
+        if self.__bitmap & bit:
+            return False
+        else:
+            self.__bitmap |= bit
+            return True
+
+
 __all__ = [
     KeyHandler,
+    ReplayWindow,
 ]
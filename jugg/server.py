@@ -1,11 +1,17 @@
 import asyncio
+import errno
+import os
 import pyarchy
+import random
 import socket
-import srp
+import ssl
+import stat
 
 from . import constants, utils
 from .core import ClientBase, Datagram
+from .federation import Federation
 from .security import KeyHandler
+from .storage import OfflineQueue
 
 
 class ClientAI(ClientBase):
@@ -19,17 +25,61 @@ class ClientAI(ClientBase):
             hmac_key, challenge_key)
 
     async def start(self):
-        server.conns.add(self)
+        self.server.conns.add(self)
         await super().start()
 
     async def stop(self):
         await super().stop()
-        server.conns.remove(self)
+        self.server.conns.remove(self)
+        self.server.leave(self)
+
+    async def migrate(self, backoff: float = constants.MIGRATE_BACKOFF):
+        # Jitter the reconnect so clients don't return all at once
+        await self.send_migrate(random.uniform(0, backoff))
+
+        # Flush the outbound buffer before closing
+        await self._stream_writer.drain()
+        await super().stop()
+
+    def is_relayed(self, dg: Datagram) -> bool:
+        # Application datagrams from a joined client to another client;
+        # control commands are never relayed
+        return self.server.names.get(self.name) is self and \
+            dg.command not in constants.CMD_2_NAME and \
+            dg.recipient not in (None, self.name, str(self.id)) and \
+            utils.validate_name(dg.recipient)
+
+    async def handle_datagram(self, dg: Datagram):
+        if self.is_relayed(dg):
+            # Stamp the authenticated sender; deliver, forward or hold it
+            await self.server.route(
+                Datagram(
+                    command = dg.command,
+                    sender = self.name,
+                    recipient = dg.recipient,
+                    data = dg.data,
+                    timestamp = dg.timestamp))
+        else:
+            return await super().handle_datagram(dg)
+
+    async def handle_presence(self, dg: Datagram):
+        if self.server.federation:
+            await self.server.federation.handle_presence(self, dg)
+        else:
+            await self.send_error(constants.ERR_PEER)
+
+    async def handle_forward(self, dg: Datagram):
+        if self.server.federation:
+            await self.server.federation.handle_forward(self, dg)
+        else:
+            await self.send_error(constants.ERR_PEER)
 
     def verify_credentials(self, data):
         return utils.validate_name(data)
 
     async def handle_authenticate(self, dg: Datagram):
+        import srp
+
         # Credentials
         if not self.verify_credentials(dg.data):
             await self.send_error(constants.ERR_CREDENTIALS)
@@ -83,6 +133,12 @@ class ClientAI(ClientBase):
                 await self.send_response(HAMK.hex())
                 self.counter_cipher = svr.get_session_key()
                 self.name = dg.data
+
+                if dg.hmac and self.server.federation:
+                    # Another server node, not a client
+                    await self.server.federation.accept(self, dg)
+                else:
+                    await self.server.join(self)
             else:
                 await self.send_error(constants.ERR_VERIFICATION)
                 return
@@ -98,10 +154,17 @@ class Server(object):
     def __init__(self,
                  host: str = None, port: int = None,
                  socket_: socket.socket = None,
-                 hmac_key: bytes = None, challenge_key: bytes = None):
+                 hmac_key: bytes = None, challenge_key: bytes = None,
+                 path: str = None, ssl_: ssl.SSLContext = None,
+                 spool: str = None,
+                 node: str = None, peers: list = None,
+                 federation_key: bytes = None):
         KeyHandler.__init__(self)
 
-        if host and port:
+        if path:
+            self._address = path
+            self._socket = None
+        elif host and port:
             self._address = (host, port)
             self._socket = None
         elif socket_:
@@ -113,6 +176,25 @@ class Server(object):
         self._hmac_key = hmac_key or b''
         self._challenge_key = challenge_key or b''
 
+        self._ssl = ssl_
+        self._server = None
+
+        # Authenticated clients by name, and storage for the absent ones
+        self.names = {}
+        self._joining = {}
+        self.offline = OfflineQueue(spool) if spool else None
+
+        # Other server nodes sharing the client directory
+        if node and not federation_key:
+            raise TypeError('must supply federation_key to federate')
+        elif node:
+            self.federation = Federation(
+                self, node, peers,
+                self._hmac_key, self._challenge_key,
+                federation_key)
+        else:
+            self.federation = None
+
     async def new_connection(self, stream_reader, stream_writer, **kwargs):
         try:
             # Create the client on the server
@@ -121,13 +203,44 @@ class Server(object):
                 self._hmac_key, self._challenge_key,
                 **kwargs)
             conn.id = pyarchy.core.Identity()
-            return conn
+            conn.server = self
         except asyncio.CancelledError:
             return None
 
+        # Maintain the connection
+        try:
+            await conn.start()
+        finally:
+            await conn.stop()
+
+        return conn
+
     def start(self):
         if self._socket:
             pass
+        elif isinstance(self._address, str):
+            # Remove the socket file left by a previous run, but never
+            # take over one that a running server is listening on
+            try:
+                if stat.S_ISSOCK(os.stat(self._address).st_mode):
+                    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    try:
+                        probe.connect(self._address)
+                    except ConnectionRefusedError:
+                        os.unlink(self._address)
+                    else:
+                        raise OSError(
+                            errno.EADDRINUSE,
+                            'a server is already listening on %r'
+                            % self._address)
+                    finally:
+                        probe.close()
+            except FileNotFoundError:
+                pass
+
+            # Make the Unix domain socket
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.bind(self._address)
         elif self._address:
             # Make the socket
             self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -143,13 +256,80 @@ class Server(object):
             lambda: asyncio.StreamReaderProtocol(
                 asyncio.StreamReader(),
                 self.new_connection),
-            sock=self._socket)
+            sock=self._socket,
+            ssl=self._ssl)
 
         # Make the client pool
         self.conns = pyarchy.data.ItemPool()
         self.conns.object_type = ClientBase
 
-        self.run(loop, server_coro)
+        self.run(loop, self.listen(server_coro))
+
+    async def join(self, conn: ClientBase):
+        # Hold live datagrams until the stored backlog is out, so the
+        # client receives everything in order
+        held = self._joining[conn.name] = []
+
+        try:
+            if self.offline and \
+               not await self.offline.drain(conn.name, conn.send_many):
+                return
+
+            while held:
+                batch = held[:]
+                del held[:]
+
+                if not await conn.send_many(batch):
+                    held[:0] = batch
+                    return
+
+            self.names[conn.name] = conn
+        finally:
+            if self._joining.get(conn.name) is held:
+                del self._joining[conn.name]
+
+            # Store what the client left before receiving
+            if held and self.offline:
+                await self.offline.put_many(conn.name, held)
+
+        if self.federation:
+            await self.federation.announce(joined = [conn.name])
+
+    def leave(self, conn: ClientBase):
+        if self.names.get(conn.name) is conn:
+            del self.names[conn.name]
+
+            if self.federation:
+                asyncio.ensure_future(
+                    self.federation.announce(left = [conn.name]))
+
+        if self.federation:
+            self.federation.unlink(conn)
+
+    async def route(self, dg: Datagram, forwarded: bool = False) -> bool:
+        conn = self.names.get(dg.recipient)
+        if dg.recipient in self._joining:
+            self._joining[dg.recipient].append(dg)
+        elif conn:
+            await conn.send(dg)
+        elif not forwarded and self.federation and \
+             await self.federation.forward(dg):
+            pass
+        elif self.offline and utils.validate_name(dg.recipient or ''):
+            await self.offline.put(dg.recipient, dg)
+        else:
+            return False
+
+        return True
+
+    async def listen(self, server_coro):
+        self._server = await server_coro
+
+        if self.offline:
+            self.offline.start()
+
+        if self.federation:
+            self.federation.start()
 
     def run(self, event_loop, start_coro):
         # Maintain the connection
@@ -158,9 +338,35 @@ class Server(object):
             start_coro, self.stop(),
             run_forever=True)
 
+    async def migrate(self, conn: ClientAI):
+        try:
+            await asyncio.wait_for(conn.migrate(), constants.MIGRATE_TIMEOUT)
+        except asyncio.TimeoutError:
+            # The client stopped reading; drop it rather than stall the drain
+            conn._stream_writer.transport.abort()
+
     async def stop(self):
-        # Cleanup
-        pass
+        # Stop accepting new connections
+        if self._server:
+            self._server.close()
+
+        if self.federation:
+            await self.federation.stop()
+
+        # Migrate the clients away in bounded batches
+        conns = list(self.conns)
+        for i in range(0, len(conns), constants.DRAIN_BATCH_SIZE):
+            await asyncio.gather(
+                *(self.migrate(conn)
+                  for conn in conns[i:i + constants.DRAIN_BATCH_SIZE]),
+                return_exceptions=True)
+            await asyncio.sleep(constants.DRAIN_INTERVAL)
+
+        if self._server:
+            await self._server.wait_closed()
+
+        if self.offline:
+            await self.offline.shutdown()
 
 
 __all__ = [
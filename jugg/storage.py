@@ -0,0 +1,375 @@
+import asyncio
+import collections
+import concurrent.futures
+import os
+import struct
+import time
+
+from . import constants, utils
+from .datagram import Datagram
+
+
+class OfflineQueue(object):
+
+    # Length prefix of each record in a segment
+    pointer = struct.Struct('!I')
+
+    def __init__(self,
+                 root: str,
+                 segment_size: int = constants.OFFLINE_SEGMENT_SIZE,
+                 fsync_batch: int = constants.OFFLINE_FSYNC_BATCH,
+                 fsync_interval: float = constants.OFFLINE_FSYNC_INTERVAL,
+                 max_age: float = constants.OFFLINE_MAX_AGE,
+                 max_bytes: int = constants.OFFLINE_MAX_BYTES,
+                 max_total_bytes: int = constants.OFFLINE_MAX_TOTAL_BYTES,
+                 max_writers: int = constants.OFFLINE_MAX_WRITERS,
+                 idle_timeout: float = constants.OFFLINE_IDLE_TIMEOUT,
+                 expire_interval: float = constants.OFFLINE_EXPIRE_INTERVAL):
+        object.__init__(self)
+
+        self._root = os.path.abspath(root)
+        os.makedirs(self._root, exist_ok=True)
+
+        self._segment_size = segment_size
+        self._fsync_batch = fsync_batch
+        self._fsync_interval = fsync_interval
+        self._max_age = max_age
+        self._max_bytes = max_bytes
+        self._max_total_bytes = max_total_bytes
+        self._max_writers = max_writers
+        self._idle_timeout = idle_timeout
+        self._expire_interval = expire_interval
+
+        # Open segment per recipient, least recently written first, and
+        # those written since the last fsync
+        self._writers = collections.OrderedDict()
+        self._written = {}
+        self._dirty = set()
+        self._pending = 0
+        self._last_sync = time.time()
+        self._timer = None
+        self._task = None
+
+        # Bytes stored across every recipient
+        self._total = sum(
+            os.path.getsize(segment)
+            for name in self.names()
+            for segment in self.segments(name))
+
+        # One worker keeps the disk I/O off the event loop, and in order
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def __contains__(self, name: str):
+        return bool(self.segments(name))
+
+    def _path(self, name: str) -> str:
+        if not utils.validate_name(name):
+            raise ValueError('invalid recipient name %r' % name)
+        else:
+            return os.path.join(self._root, name)
+
+    def names(self) -> list:
+        return [
+            name
+            for name in sorted(os.listdir(self._root))
+            if utils.validate_name(name) and
+            os.path.isdir(os.path.join(self._root, name))]
+
+    def stored(self, names: list) -> list:
+        # Those of the names with anything stored
+        return [
+            name
+            for name in names
+            if isinstance(name, str) and utils.validate_name(name) and
+            self.segments(name)]
+
+    def segments(self, name: str) -> list:
+        path = self._path(name)
+        if os.path.isdir(path):
+            return [
+                os.path.join(path, segment)
+                for segment in sorted(os.listdir(path))
+                if segment.endswith('.log')]
+        else:
+            return []
+
+    def append(self, name: str, dg: Datagram) -> bool:
+        writer = self._writers.get(name)
+        if writer is None:
+            writer = self._open(name)
+
+        data = dg.to_bytes()
+        data = self.pointer.pack(len(data)) + data
+        writer.write(data)
+
+        self._writers.move_to_end(name)
+        self._written[name] = time.time()
+        self._total += len(data)
+
+        # Hand every record to the OS, so only a host crash can lose it
+        writer.flush()
+
+        self._dirty.add(name)
+        self._pending += 1
+
+        # Rotate full segments
+        if writer.tell() >= self._segment_size:
+            self._close(name)
+            self.expire(name)
+
+        # Drop the oldest messages of anyone once the spool is full
+        if self._total > self._max_total_bytes:
+            self.trim()
+
+        # Batch the fsyncs by count and age
+        if self._pending >= self._fsync_batch or \
+           time.time() - self._last_sync >= self._fsync_interval:
+            self.sync()
+
+        # Whether a timed fsync is still needed
+        return bool(self._dirty)
+
+    def extend(self, name: str, dgs: list) -> bool:
+        synced = True
+        for dg in dgs:
+            synced = not self.append(name, dg)
+
+        return not synced
+
+    async def run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._maintain())
+
+    async def _maintain(self):
+        # Age out recipients that never come back, and idle writers
+        while True:
+            await asyncio.sleep(self._expire_interval)
+            await self.run(self.maintain)
+
+    async def put(self, name: str, dg: Datagram):
+        await self.put_many(name, [dg])
+
+    async def put_many(self, name: str, dgs: list):
+        if await self.run(self.extend, name, dgs) and self._timer is None:
+            # Sync an idle queue too, not just on the next append
+            loop = asyncio.get_event_loop()
+            self._timer = loop.call_later(
+                self._fsync_interval,
+                self._sync_later)
+
+    def _sync_later(self):
+        self._timer = None
+        asyncio.ensure_future(self.run(self.sync))
+
+    async def drain(self,
+                    name: str,
+                    send,
+                    batch_size: int = constants.OFFLINE_BATCH_SIZE) -> bool:
+        for segment in await self.run(self.seal, name):
+            for offset, batch in await self.run(
+                    self.batches, segment, batch_size):
+                if not await send(batch):
+                    # Keep the rest; it is delivered again next time
+                    return False
+
+                # Never send a confirmed batch twice
+                await self.run(self.ack, segment, offset)
+
+            # Only discard a segment once all of it has been sent
+            await self.run(self.remove, segment)
+
+        return True
+
+    async def shutdown(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        await self.run(self.close)
+        self._executor.shutdown()
+
+    def seal(self, name: str) -> list:
+        # Finish writing before reading back
+        self._close(name)
+        self.expire(name)
+
+        return self.segments(name)
+
+    def batches(self,
+                segment: str,
+                batch_size: int = constants.OFFLINE_BATCH_SIZE) -> list:
+        # Each batch with the offset just past it, resuming after the last
+        # acknowledged one
+        batches = []
+        batch = []
+        for offset, dg in self._read(segment, self.acked(segment)):
+            batch.append(dg)
+            if len(batch) >= batch_size:
+                batches.append((offset, batch))
+                batch = []
+
+        if batch:
+            batches.append((offset, batch))
+
+        return batches
+
+    def acked(self, segment: str) -> int:
+        try:
+            with open(segment[:-4] + '.ack', 'rb') as f:
+                return self.pointer.unpack(f.read())[0]
+        except (FileNotFoundError, struct.error):
+            return 0
+
+    def ack(self, segment: str, offset: int):
+        # Replace the offset whole, so a crash leaves the old or new one
+        path = segment[:-4] + '.ack'
+        with open(path + '.tmp', 'wb') as f:
+            f.write(self.pointer.pack(offset))
+
+        os.replace(path + '.tmp', path)
+
+    def remove(self, segment: str):
+        try:
+            self._total -= os.path.getsize(segment)
+        except FileNotFoundError:
+            pass
+
+        for path in (segment, segment[:-4] + '.ack'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def expire(self, name: str):
+        segments = self.segments(name)
+        writer = self._writers.get(name)
+        if writer:
+            # Never expire the segment being written
+            segments.remove(writer.name)
+
+        cutoff = time.time() - self._max_age
+        total = sum(os.path.getsize(segment) for segment in segments)
+
+        for segment in segments:
+            size = os.path.getsize(segment)
+            if os.path.getmtime(segment) < cutoff or total > self._max_bytes:
+                self.remove(segment)
+                total -= size
+
+    def trim(self):
+        # Oldest closed segments first, across every recipient
+        open_ = {writer.name for writer in self._writers.values()}
+        segments = sorted(
+            (os.path.getmtime(segment), segment)
+            for name in self.names()
+            for segment in self.segments(name)
+            if segment not in open_)
+
+        for _, segment in segments:
+            if self._total <= self._max_total_bytes:
+                break
+            else:
+                self.remove(segment)
+
+    def maintain(self):
+        # Close writers nobody has written to lately; they hold descriptors
+        cutoff = time.time() - self._idle_timeout
+        for name, written in list(self._written.items()):
+            if written < cutoff:
+                self._close(name)
+
+        for name in self.names():
+            self.expire(name)
+
+            # Forget recipients with nothing stored
+            if name not in self._writers:
+                try:
+                    os.rmdir(self._path(name))
+                except OSError:
+                    pass
+
+        self.trim()
+
+    def sync(self):
+        for name in self._dirty:
+            writer = self._writers.get(name)
+            if writer:
+                writer.flush()
+                os.fsync(writer.fileno())
+
+        self._dirty.clear()
+        self._pending = 0
+        self._last_sync = time.time()
+
+    def close(self):
+        self.sync()
+
+        for name in list(self._writers):
+            self._close(name)
+
+    def _open(self, name: str):
+        path = self._path(name)
+        os.makedirs(path, exist_ok=True)
+
+        segments = self.segments(name)
+        if segments:
+            index = int(os.path.basename(segments[-1])[:-4]) + 1
+        else:
+            index = 0
+
+        # Bound the open descriptors
+        while len(self._writers) >= self._max_writers:
+            self._close(next(iter(self._writers)))
+
+        writer = open(os.path.join(path, '%020d.log' % index), 'ab')
+        self._writers[name] = writer
+        return writer
+
+    def _close(self, name: str):
+        writer = self._writers.pop(name, None)
+        self._written.pop(name, None)
+        if writer:
+            writer.flush()
+            os.fsync(writer.fileno())
+            writer.close()
+
+        self._dirty.discard(name)
+
+    def _read(self, segment: str, offset: int = 0):
+        with open(segment, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+
+        # Records with the segment offset just past each one
+        start = offset
+        offset = 0
+        while offset + self.pointer.size <= len(data):
+            n_bytes, = self.pointer.unpack_from(data, offset)
+            offset += self.pointer.size
+
+            # Torn write at the tail
+            if offset + n_bytes > len(data):
+                break
+
+            try:
+                dg = Datagram.from_bytes(data[offset:offset + n_bytes])
+            except (TypeError, ValueError):
+                # Corrupt record
+                dg = None
+
+            offset += n_bytes
+
+            if dg:
+                yield start + offset, dg
+
+
+__all__ = [
+    OfflineQueue,
+]
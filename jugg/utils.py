@@ -1,5 +1,7 @@
 import asyncio
+import itertools
 import re
+import socket
 
 from . import constants
 
@@ -12,18 +14,109 @@ def reactive_event_loop(loop, start_task, stop_task, run_forever = False):
     except KeyboardInterrupt:
         pass
     finally:
-        for task in asyncio.Task.all_tasks():
+        # Let the stop task drain before cancelling what remains
+        loop.run_until_complete(stop_task)
+
+        for task in asyncio.all_tasks(loop):
             task.cancel()
 
-        loop.run_until_complete(stop_task)
         loop.stop()
 
 
+async def open_connection(addresses,
+                          timeout: float = constants.CONNECT_TIMEOUT,
+                          delay: float = constants.CONNECT_DELAY,
+                          **kwargs):
+    loop = asyncio.get_event_loop()
+
+    # Resolve every address at once
+    results = await asyncio.gather(
+        *(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+          for host, port in addresses),
+        return_exceptions=True)
+
+    infos = []
+    for result in results:
+        if not isinstance(result, Exception):
+            infos.extend(result)
+
+    # Alternate address families, preferring the first one resolved
+    families = {}
+    for info in infos:
+        families.setdefault(info[0], []).append(info)
+
+    infos = [
+        info
+        for group in itertools.zip_longest(*families.values())
+        for info in group
+        if info is not None]
+
+    sock = await asyncio.wait_for(
+        _race_connections(loop, infos, delay),
+        timeout)
+
+    return await asyncio.open_connection(sock=sock, **kwargs)
+
+
+async def _connect_socket(loop, info):
+    family, type_, proto, _, address = info
+
+    sock = socket.socket(family, type_, proto)
+    sock.setblocking(False)
+
+    try:
+        await loop.sock_connect(sock, address)
+    except BaseException:
+        sock.close()
+        raise
+
+    return sock
+
+
+async def _race_connections(loop, infos, delay):
+    # Happy eyeballs: start an attempt every `delay` seconds, or as soon as
+    # the previous one fails, and keep the first one that succeeds
+    infos = iter(infos)
+    pending = set()
+    winner = None
+
+    try:
+        while winner is None:
+            info = next(infos, None)
+            if info:
+                pending.add(loop.create_task(_connect_socket(loop, info)))
+            elif not pending:
+                break
+
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=delay if info else None,
+                return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task.exception():
+                    continue
+                elif winner is None:
+                    winner = task.result()
+                else:
+                    task.result().close()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if winner is None:
+        raise ConnectionError(
+            constants.ERROR_INFO_MAP[constants.ERR_NO_CONNECTION])
+    else:
+        return winner
+
+
 def validate_name(name):
     return bool(re.fullmatch(constants.NAME_REGEX, name))
 
 
 __all__ = [
     reactive_event_loop,
+    open_connection,
     validate_name,
 ]
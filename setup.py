@@ -75,15 +75,13 @@ setup(
     url = URL,
     packages = find_packages(exclude = ('tests',)),
     install_requires = REQUIRED,
+    python_requires = '>=3.7',
     include_package_data = True,
     license = ABOUT['__license__'],
     classifiers = [
         'License :: OSI Approved :: %s License' % ABOUT['__license__'],
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
     ],
     cmdclass = {
         'publish': PublishCommand,
@@ -0,0 +1,49 @@
+import asyncio
+import socket
+
+import jugg
+
+
+async def connect():
+    a, b = socket.socketpair()
+    nodes = []
+    for sock in (a, b):
+        nodes.append(jugg.core.Node(*await asyncio.open_connection(sock = sock)))
+
+    # Key both directions, as a handshake and authentication would
+    na, nb = nodes
+    na.counter_key = nb.key
+    nb.counter_key = na.key
+    na.counter_cipher = nb.counter_cipher = b'session'
+
+    return na, nb
+
+
+def test_rekey_counts_from_keying(monkeypatch):
+    monkeypatch.setattr(jugg.constants, 'REKEY_INTERVAL', 60)
+
+    async def run():
+        na, nb = await connect()
+        na._rekey_bytes = jugg.constants.REKEY_BYTES
+        assert not na.rekey_due() and na._rekey_bytes == 0
+
+    asyncio.run(run())
+
+
+def test_rekey_ratchet(monkeypatch):
+    monkeypatch.setattr(jugg.constants, 'REKEY_BYTES', 512)
+
+    async def run():
+        na, nb = await connect()
+
+        # Both ways, across several epochs
+        for i in range(20):
+            await na.send_response('a%i' % i)
+            await nb.send_response('b%i' % i)
+            assert (await nb.recv()).data == 'a%i' % i
+            assert (await na.recv()).data == 'b%i' % i
+
+        assert na.send_epoch == nb.recv_epoch > 2
+        assert nb.send_epoch == na.recv_epoch > 2
+
+    asyncio.run(run())
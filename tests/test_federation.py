@@ -0,0 +1,122 @@
+import asyncio
+import socket
+
+import pyarchy
+
+import jugg
+
+
+CMD_CHAT = 100
+
+
+class User(jugg.client.Client):
+
+    def __init__(self, *args, user = None, **kwargs):
+        jugg.client.Client.__init__(self, *args, **kwargs)
+
+        self.user = user
+        self.inbox = []
+        self._commands[CMD_CHAT] = self.handle_chat
+
+    async def handle_handshake(self, dg):
+        await super().handle_handshake(dg)
+        await self.send(
+            jugg.core.Datagram(
+                command = jugg.constants.CMD_AUTH,
+                data = self.user))
+
+    async def handle_chat(self, dg):
+        self.inbox.append((dg.sender, dg.data))
+
+
+def bind():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    return sock
+
+
+async def boot(sock, node, peers, federation_key):
+    server = jugg.server.Server(
+        socket_ = sock,
+        node = node,
+        peers = [sock.getsockname() for sock in peers],
+        federation_key = federation_key)
+
+    # As Server.start does, without taking over the event loop
+    server.conns = pyarchy.data.ItemPool()
+    server.conns.object_type = jugg.core.ClientBase
+
+    loop = asyncio.get_event_loop()
+    await server.listen(
+        loop.create_server(
+            lambda: asyncio.StreamReaderProtocol(
+                asyncio.StreamReader(),
+                server.new_connection),
+            sock = sock))
+
+    return server
+
+
+async def wait_for(condition, timeout = 30):
+    for _ in range(int(timeout / 0.1)):
+        if condition():
+            return True
+        else:
+            await asyncio.sleep(0.1)
+
+    return False
+
+
+def test_federation(monkeypatch):
+    monkeypatch.setattr(jugg.constants, 'PEER_RETRY', 0.2)
+
+    async def run():
+        socks = [bind() for _ in range(3)]
+        a, b, c = socks
+
+        # C dials A with the wrong key
+        servers = [
+            await boot(a, 'a', [b], b'federation'),
+            await boot(b, 'b', [a], b'federation'),
+            await boot(c, 'c', [a], b'intruder'),
+        ]
+        node_a, node_b, node_c = servers
+
+        try:
+            # Links form between A and B only
+            assert await wait_for(
+                lambda: 'b' in node_a.federation.links and
+                'a' in node_b.federation.links)
+
+            alice = await User.connect(*a.getsockname(), user = 'alice')
+            bob = await User.connect(*b.getsockname(), user = 'bob')
+            clients = [
+                asyncio.ensure_future(user.start())
+                for user in (alice, bob)]
+
+            assert await wait_for(
+                lambda: node_a.federation.directory.lookup('bob') == 'b')
+
+            # A client on A reaches a client on B
+            await alice.send(
+                jugg.core.Datagram(
+                    command = CMD_CHAT,
+                    recipient = 'bob',
+                    data = 'hi'))
+            assert await wait_for(lambda: bob.inbox)
+            assert bob.inbox == [('alice', 'hi')]
+
+            # The node with the wrong key is never linked
+            assert 'c' not in node_a.federation.links
+            assert not node_c.federation.links
+
+            for user in (alice, bob):
+                await user.stop()
+            for task in clients:
+                task.cancel()
+        finally:
+            for server in servers:
+                await server.stop()
+
+    asyncio.run(run())
+
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import jugg
+
+
+# Each submodule must import on its own, in either style, in a fresh
+# interpreter; lazy loading no longer hides import cycles
+def test_imports():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.join(os.path.dirname(__file__), '..')
+
+    for name in jugg.__all__:
+        for statement in ('import jugg.%s', 'import jugg; jugg.%s'):
+            subprocess.check_call(
+                [sys.executable, '-c', statement % name],
+                env = env)
+
+
+if __name__ == '__main__':
+    test_imports()
@@ -0,0 +1,52 @@
+import time
+
+import jugg
+
+
+def test_replay_window_duplicates():
+    window = jugg.security.ReplayWindow(size = 8)
+    now = time.time()
+
+    assert window.verify(1, now)
+    assert not window.verify(1, now)
+    assert window.verify(2, now)
+    assert not window.verify(2, now)
+
+
+def test_replay_window_out_of_order():
+    window = jugg.security.ReplayWindow(size = 8)
+    now = time.time()
+
+    assert window.verify(5, now)
+    assert window.verify(3, now)
+    assert window.verify(4, now)
+    assert not window.verify(3, now)
+    assert window.highest == 5
+
+
+def test_replay_window_behind():
+    window = jugg.security.ReplayWindow(size = 8)
+    now = time.time()
+
+    assert window.verify(20, now)
+    assert not window.verify(12, now)
+    assert window.verify(13, now)
+    assert not window.verify(0, now)
+
+
+def test_replay_window_timestamps():
+    window = jugg.security.ReplayWindow(size = 8, skew = 10)
+    now = time.time()
+
+    assert not window.verify(1, now - 100)
+    assert not window.verify(2, now + 100)
+    assert window.verify(3, now - 5)
+
+
+def test_replay_window_defaults(monkeypatch):
+    monkeypatch.setattr(jugg.constants, 'REPLAY_WINDOW', 16)
+    monkeypatch.setattr(jugg.constants, 'CLOCK_SKEW', 1000.0)
+
+    window = jugg.security.ReplayWindow()
+    assert window.size == 16
+    assert window.skew == 1000.0